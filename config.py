@@ -12,6 +12,8 @@ DB_DRIVER = "ODBC Driver 17 for SQL Server"
 # You can also try:
 # DB_DRIVER = "ODBC Driver 18 for SQL Server"
 
+DB_LOGIN_TIMEOUT = 5  # seconds to wait for the SQL Server login
+
 TABLE_NAME = "dbo.Loans"  # Change to your real table
 
 # -----------------------------
@@ -29,3 +31,28 @@ FROM_NAME = "Loan Due Report"
 TO_EMAIL = "creditloans@company.com"
 TO_NAME = "Credit & Loans Department"
 
+
+# -----------------------------
+# REPORT ARCHIVE SETTINGS
+# -----------------------------
+# DEFLATE level for the emailed ZIP/gzip: 1 = fast, 6 = balanced, 9 = max.
+# The report is compressed once and sent once, so max is the sensible default.
+# With libdeflate installed, 9 is promoted to its level 12 (smaller than zlib can reach).
+COMPRESSION_LEVEL = 9
+
+# Archive format for the emailed report:
+#   "zip"  - DEFLATE ZIP, opens anywhere (default)
+#   "gzip" - single .csv.gz file: one compression pass, no ZIP container;
+#            best for small reports if the recipient can open .gz files
+#   "zstd" - single .csv.zst file, smaller and faster to build, but the
+#            recipient needs a Zstandard-capable tool (pip install zstandard)
+ARCHIVE_FORMAT = "zip"
+ZSTD_LEVEL = 19
+# Input per zstd worker thread; ~4 MiB jobs scale well across cores on
+# large reports (small reports fit in one job and are unaffected). The
+# zstd match window is derived from it (largest power of two that fits).
+ZSTD_JOB_SIZE = 4 * 1024 * 1024
+
+# Also attach a Parquet copy (zstd, dictionary-encoded) for archival or
+# analysis tools; needs pyarrow. The CSV archive is always attached.
+ATTACH_PARQUET = False
@@ -1,15 +1,61 @@
+import io
 import os
+import re
+import asyncio
 import csv
+import gzip
+import ssl
+import struct
+import uuid
 import zipfile
 import smtplib
-import pyodbc
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
 from email.message import EmailMessage
 
 import config
 
+try:
+    import deflate  # libdeflate bindings: faster whole-buffer DEFLATE than zlib
+except ImportError:
+    deflate = None
+
+try:
+    import zstandard as zstd  # only needed for ARCHIVE_FORMAT = "zstd"
+except ImportError:
+    zstd = None
+
+# Rows pulled per ODBC round-trip while streaming the report
+FETCH_BATCH_SIZE = 10000
+
+CSV_HEADER = ["Member Number", "Member Name", "Due Date", "Loan Amount"]
+CSV_LINE = "{},{},{},{}\r\n".format
+CSV_SPECIAL_CHARS = re.compile(r'[,"\r\n]')
+
+ATTACHMENT_SUBTYPES = {
+    ".zip": "zip",
+    ".gz": "gzip",
+    ".zst": "zstd",
+    ".parquet": "vnd.apache.parquet",
+}
+
+# Built once: loading the CA bundle is the expensive part of a TLS context
+_ssl_context = ssl.create_default_context()
+
+# Reused across runs when this module is driven from a long-lived process
+_sql_connection = None
+_smtp_session = None
+
 
 def connect_sql_server():
+    # Imported here so the report/email code can be used (and tested)
+    # without an ODBC driver manager installed
+    import pyodbc
+
+    # Must be set before the first connect; lets the ODBC driver manager keep
+    # and reuse driver connections instead of redoing the full handshake.
+    pyodbc.pooling = True
+
     conn_str = (
         f"DRIVER={{{config.DB_DRIVER}}};"
         f"SERVER={config.DB_SERVER};"
@@ -18,75 +64,361 @@ def connect_sql_server():
         f"PWD={config.DB_PASSWORD};"
         "TrustServerCertificate=yes;"
     )
-    return pyodbc.connect(conn_str)
+    # Read-only workload: skip implicit transaction bookkeeping
+    return pyodbc.connect(conn_str, autocommit=True, timeout=config.DB_LOGIN_TIMEOUT)
+
+
+def get_sql_connection():
+    global _sql_connection
+
+    if _sql_connection is not None:
+        import pyodbc  # already loaded by connect_sql_server
+
+        try:
+            _sql_connection.execute("SELECT 1").fetchone()
+            return _sql_connection
+        except pyodbc.Error:
+            try:
+                _sql_connection.close()
+            except pyodbc.Error:
+                pass
+
+    _sql_connection = connect_sql_server()
+    return _sql_connection
+
+
+def close_sql_connection():
+    global _sql_connection
+
+    if _sql_connection is not None:
+        _sql_connection.close()
+        _sql_connection = None
+
+
+def _iter_batches(cursor):
+    # One fetchmany() batch (up to FETCH_BATCH_SIZE rows) at a time
+    while True:
+        rows = cursor.fetchmany()
+        if not rows:
+            return
+        yield rows
+
+
+def _tally(batches, totals):
+    # Count and sum the rows as they stream past, so the email totals come
+    # from exactly the rows written to the report
+    for batch in batches:
+        totals.count += len(batch)
+        totals.amount += sum(float(row[3]) for row in batch)
+        yield batch
 
 
 def fetch_loans_due_next_7_days(conn):
+    # Returns (batches, totals): the detail rows are streamed in fetchmany
+    # batches straight into the CSV writer, and totals.count/totals.amount
+    # are complete once the batches have been consumed. The connection must
+    # stay open until then.
+    #
+    # The date bounds are plain parameters so the predicate stays sargable;
+    # with this index the query is answered by a range seek:
+    #   CREATE NONCLUSTERED INDEX ix_due_date ON dbo.Loans (due_date)
+    #       INCLUDE (member_number, member_name, loan_amount);
+    today = date.today()
+    start, end = today, today + timedelta(days=8)
     query = f"""
         SELECT member_number, member_name, due_date, loan_amount
         FROM {config.TABLE_NAME}
-        WHERE due_date >= CAST(GETDATE() AS DATE)
-          AND due_date <= DATEADD(DAY, 7, CAST(GETDATE() AS DATE))
+        WHERE due_date >= ?
+          AND due_date < ?
         ORDER BY due_date ASC
     """
     cursor = conn.cursor()
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    return rows
+    cursor.arraysize = FETCH_BATCH_SIZE
+    cursor.execute(query, start, end)
 
+    totals = SimpleNamespace(count=0, amount=0.0)
+    return _tally(_iter_batches(cursor), totals), totals
 
-def create_report_folder(base_dir, today_str):
+
+def create_reports_dir(base_dir):
     reports_dir = os.path.join(base_dir, "reports")
     os.makedirs(reports_dir, exist_ok=True)
+    return reports_dir
+
+
+def _format_due_date(due_date):
+    # Convert SQL Server date to string
+    if hasattr(due_date, "strftime"):
+        return due_date.strftime("%Y-%m-%d")
+    return due_date
+
 
-    folder_name = f"LoanDueReport_{today_str}"
-    folder_path = os.path.join(reports_dir, folder_name)
-    os.makedirs(folder_path, exist_ok=True)
+def _quote_amount(amount):
+    # Amounts of 1,000 and up contain the thousands separator
+    return f'"{amount}"' if "," in amount else amount
 
-    return folder_name, folder_path
 
+def _is_plain_csv(*columns):
+    # True when no value needs csv quoting (or is None, which csv writes as "")
+    for column in columns:
+        if None in column or CSV_SPECIAL_CHARS.search("".join(map(str, column))):
+            return False
+    return True
+
+
+def write_csv(f, batches):
+    # Rows arrive one fetchmany batch at a time and each batch is written
+    # before the next is fetched, so only one batch is held in memory. Within
+    # a batch the rows are pivoted into columns and each column is formatted
+    # with map(), saving the per-row tuple unpacking and attribute lookups.
+    f.write(",".join(CSV_HEADER) + "\r\n")
+    writer = csv.writer(f)
+
+    for batch in batches:
+        member_numbers, member_names, due_dates, loan_amounts = zip(*batch)
+        due_dates = list(map(_format_due_date, due_dates))
+        loan_amounts = list(map("{:,.2f}".format, map(float, loan_amounts)))
+
+        # Usual case: nothing needs quoting, so one fixed-shape str.format per
+        # line produces exactly what csv.writer would, without its per-field
+        # dispatch. Anything unusual goes through csv.writer.
+        if _is_plain_csv(member_numbers, member_names, due_dates):
+            f.write("".join(map(CSV_LINE, member_numbers, member_names, due_dates,
+                                map(_quote_amount, loan_amounts))))
+        else:
+            writer.writerows(zip(member_numbers, member_names, due_dates, loan_amounts))
+
+
+def render_csv(batches):
+    # Collect the lines csv.writer emits and join them once: str.join sizes
+    # the result in a single allocation instead of regrowing a buffer.
+    lines = []
+    write_csv(SimpleNamespace(write=lines.append), batches)
+    return "".join(lines).encode("utf-8")
+
+
+def _dos_datetime(t):
+    dos_time = (t.hour << 11) | (t.minute << 5) | (t.second // 2)
+    dos_date = ((t.year - 1980) << 9) | (t.month << 5) | t.day
+    return dos_time, dos_date
+
+
+def _libdeflate_level(level):
+    # libdeflate goes up to 12; treat zlib's maximum as "use libdeflate's maximum".
+    return 12 if level >= 9 else level
+
+
+def write_libdeflate_zip(out, members, level):
+    # Same archive layout zipfile.ZIP_DEFLATED produces, but each member is
+    # compressed in one call to libdeflate instead of streaming through zlib.
+    central_dir = []
+    dos_time, dos_date = _dos_datetime(datetime.now())
+
+    for arcname, data in members:
+        comp = deflate.deflate_compress(data, _libdeflate_level(level))
+        crc = deflate.crc32(data)
+        name = arcname.encode("utf-8")
+        flags = 0x800 if not name.isascii() else 0
+        offset = out.tell()
+
+        out.write(struct.pack(
+            "<4s5H3L2H", b"PK\x03\x04", 20, flags, zipfile.ZIP_DEFLATED,
+            dos_time, dos_date, crc, len(comp), len(data), len(name), 0
+        ))
+        out.write(name)
+        out.write(comp)
+
+        # Made by "Unix" (3), like zipfile on POSIX, so unzip honours the
+        # Unix mode bits in the external attributes
+        central_dir.append(struct.pack(
+            "<4s6H3L5H2L", b"PK\x01\x02", (3 << 8) | 20, 20, flags, zipfile.ZIP_DEFLATED,
+            dos_time, dos_date, crc, len(comp), len(data), len(name),
+            0, 0, 0, 0, 0o100644 << 16, offset
+        ) + name)
+
+    cd_offset = out.tell()
+    for record in central_dir:
+        out.write(record)
+    cd_size = out.tell() - cd_offset
+
+    out.write(struct.pack(
+        "<4s4H2LH", b"PK\x05\x06", 0, 0,
+        len(central_dir), len(central_dir), cd_size, cd_offset, 0
+    ))
+
+
+def _save_attachment(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return data
+
+
+# The write_report_* functions save their file and also return its bytes,
+# so send_email can attach them without reading the file back.
+
+def write_report_zip(zip_path, csv_name, loans):
+    # The archive is built in memory (it has to be, to be attached) and the
+    # CSV rows go straight into it; no intermediate CSV file on disk.
+    buf = io.BytesIO()
+
+    if deflate is None:
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED,
+                             compresslevel=config.COMPRESSION_LEVEL) as zipf, \
+                zipf.open(csv_name, "w") as raw, \
+                io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+            write_csv(f, loans)
+        return _save_attachment(zip_path, buf.getvalue())
+
+    data = render_csv(loans)
+
+    # The hand-built archive has no Zip64 records, so anything that large
+    # goes through zipfile regardless.
+    if len(data) < zipfile.ZIP64_LIMIT:
+        write_libdeflate_zip(buf, [(csv_name, data)], config.COMPRESSION_LEVEL)
+    else:
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED,
+                             compresslevel=config.COMPRESSION_LEVEL) as zipf:
+            zipf.writestr(csv_name, data)
+    del data
 
-def generate_csv(folder_path, today_str, loans):
-    csv_filename = f"Loans_Due_Next_7_Days_{today_str}.csv"
-    csv_path = os.path.join(folder_path, csv_filename)
+    return _save_attachment(zip_path, buf.getvalue())
 
-    total_amount = 0
 
-    with open(csv_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["Member Number", "Member Name", "Due Date", "Loan Amount"])
+def write_report_gzip(gz_path, loans):
+    data = render_csv(loans)
 
-        for row in loans:
-            member_number = row[0]
-            member_name = row[1]
-            due_date = row[2]
-            loan_amount = float(row[3])
+    # Both paths write a zero mtime, so identical reports give identical files
+    if deflate is not None:
+        gz_data = deflate.gzip_compress(data, _libdeflate_level(config.COMPRESSION_LEVEL))
+    else:
+        gz_data = gzip.compress(data, compresslevel=config.COMPRESSION_LEVEL, mtime=0)
+
+    return _save_attachment(gz_path, gz_data)
+
+
+def write_report_zstd(zst_path, loans):
+    if zstd is None:
+        raise RuntimeError('ARCHIVE_FORMAT = "zstd" requires the zstandard package')
 
-            # Convert SQL Server date to string
-            if hasattr(due_date, "strftime"):
-                due_date = due_date.strftime("%Y-%m-%d")
+    data = render_csv(loans)
 
-            total_amount += loan_amount
+    # threads=-1 runs one zstd worker per CPU core, each compressing a
+    # ZSTD_JOB_SIZE slice of the CSV; window_log sizes the match window to
+    # the largest power of two that fits in one job (4 MiB by default).
+    params = zstd.ZstdCompressionParameters.from_level(
+        config.ZSTD_LEVEL,
+        source_size=len(data),
+        threads=-1,
+        job_size=config.ZSTD_JOB_SIZE,
+        window_log=config.ZSTD_JOB_SIZE.bit_length() - 1,
+    )
+    cctx = zstd.ZstdCompressor(compression_params=params)
+    return _save_attachment(zst_path, cctx.compress(data))
+
+
+def write_report_parquet(parquet_path, loans):
+    # Columnar copy for archival/analysis: dictionary encoding + zstd shrink
+    # the repetitive name/date columns far more than row-wise CSV compression.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    member_numbers, member_names, due_dates, loan_amounts = [], [], [], []
+    for batch in loans:
+        for column, values in zip((member_numbers, member_names, due_dates, loan_amounts), zip(*batch)):
+            column.extend(values)
+    table = pa.table({
+        "member_number": pa.array(member_numbers),
+        "member_name": pa.array(member_names, type=pa.string()),
+        "due_date": pa.array(
+            [d.date() if isinstance(d, datetime) else d for d in due_dates],
+            type=pa.date32(),
+        ),
+        "loan_amount": pa.array([float(a) for a in loan_amounts], type=pa.float64()),
+    })
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression="zstd", compression_level=15, use_dictionary=True)
+    return _save_attachment(parquet_path, sink.getvalue().to_pybytes())
+
+
+def open_smtp_session():
+    if config.SMTP_USE_TLS:
+        server = smtplib.SMTP(config.SMTP_HOST, config.SMTP_PORT)
+    else:
+        server = smtplib.SMTP_SSL(config.SMTP_HOST, config.SMTP_PORT, context=_ssl_context)
 
-            writer.writerow([member_number, member_name, due_date, f"{loan_amount:,.2f}"])
+    try:
+        if config.SMTP_USE_TLS:
+            server.starttls(context=_ssl_context)
+        server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
+    except Exception:
+        server.close()
+        raise
 
-    return csv_path, len(loans), total_amount
+    return server
 
 
-def zip_folder(reports_dir, folder_name, folder_path):
-    zip_path = os.path.join(reports_dir, f"{folder_name}.zip")
+def get_smtp():
+    global _smtp_session
 
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                full_path = os.path.join(root, file)
-                relative_path = os.path.relpath(full_path, folder_path)
-                zipf.write(full_path, arcname=relative_path)
+    if _smtp_session is not None:
+        try:
+            if _smtp_session.noop()[0] == 250:
+                return _smtp_session
+        except (smtplib.SMTPException, OSError):
+            pass
+        _smtp_session.close()
 
-    return zip_path
+    _smtp_session = open_smtp_session()
+    return _smtp_session
 
 
-def send_email(zip_path, today_str, total_loans, total_amount):
+def close_smtp():
+    global _smtp_session
+
+    if _smtp_session is not None:
+        try:
+            _smtp_session.quit()
+        except (smtplib.SMTPException, OSError):
+            _smtp_session.close()
+        _smtp_session = None
+
+
+def _supports_binarymime(server):
+    server.ehlo_or_helo_if_needed()
+    return server.has_extn("chunking") and server.has_extn("binarymime")
+
+
+def _unique_boundary(*payloads):
+    # A binary part can't be scanned for the boundary the way text is
+    while True:
+        boundary = f"=_{uuid.uuid4().hex}"
+        if not any(boundary.encode("ascii") in data for data in payloads):
+            return boundary
+
+
+def _send_bdat(server, wire):
+    # smtplib only speaks DATA; RFC 3030 lets the whole message go as one
+    # final BDAT chunk, which is all a single report needs.
+    code, resp = server.mail(config.FROM_EMAIL, ["BODY=BINARYMIME"])
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPSenderRefused(code, resp, config.FROM_EMAIL)
+
+    code, resp = server.rcpt(config.TO_EMAIL)
+    if code not in (250, 251):
+        server.rset()
+        raise smtplib.SMTPRecipientsRefused({config.TO_EMAIL: (code, resp)})
+
+    server.send(f"BDAT {len(wire)} LAST\r\n".encode("ascii"))
+    server.send(wire)
+    code, resp = server.getreply()
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPDataError(code, resp)
+
+
+def send_email(server, attachments, today_str, total_loans, total_amount):
     msg = EmailMessage()
     msg["Subject"] = f"Loan Due Report (Next 7 Days) - {today_str}"
     msg["From"] = f"{config.FROM_NAME} <{config.FROM_EMAIL}>"
@@ -105,56 +437,109 @@ Loan Report Bot
 """
     msg.set_content(body)
 
-    # Attach ZIP
-    with open(zip_path, "rb") as f:
-        zip_data = f.read()
-
-    msg.add_attachment(
-        zip_data,
-        maintype="application",
-        subtype="zip",
-        filename=os.path.basename(zip_path)
-    )
+    # Attach report files (already in memory from build_report)
+    binary = _supports_binarymime(server)
+    markers = []
+
+    for path, data in attachments:
+        extension = os.path.splitext(path)[1]
+        attachment = {
+            "maintype": "application",
+            "subtype": ATTACHMENT_SUBTYPES.get(extension, "octet-stream"),
+            "filename": os.path.basename(path),
+        }
+
+        if binary:
+            # Raw binary attachment over BDAT: no base64, ~25% fewer bytes on
+            # the wire. The email generator rewrites line endings inside
+            # binary payloads, so serialise around a placeholder and splice
+            # the file bytes in afterwards.
+            marker = uuid.uuid4().hex.encode("ascii")
+            msg.add_attachment(marker, cte="binary", **attachment)
+            markers.append((marker, data))
+        else:
+            msg.add_attachment(data, **attachment)
+
+    if not binary:
+        server.send_message(msg)
+        return
+
+    msg.set_boundary(_unique_boundary(*(data for _, data in attachments)))
+    wire = msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+    for marker, data in markers:
+        wire = wire.replace(marker, data, 1)
+    _send_bdat(server, wire)
+
+
+def build_report(base_dir, today_str):
+    print("Connecting to SQL Server...")
+    conn = get_sql_connection()
 
-    # SMTP send
-    if config.SMTP_USE_TLS:
-        with smtplib.SMTP(config.SMTP_HOST, config.SMTP_PORT) as server:
-            server.starttls()
-            server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
-            server.send_message(msg)
+    print("Fetching loans due in next 7 days...")
+    loans, totals = fetch_loans_due_next_7_days(conn)
+    if config.ATTACH_PARQUET:
+        loans = list(loans)  # batches are read twice: once per attachment
+
+    reports_dir = create_reports_dir(base_dir)
+    report_name = f"LoanDueReport_{today_str}"
+
+    if config.ARCHIVE_FORMAT == "zstd":
+        print("Writing Zstandard-compressed CSV report...")
+        archive_path = os.path.join(reports_dir, f"{report_name}.csv.zst")
+        archive_data = write_report_zstd(archive_path, loans)
+    elif config.ARCHIVE_FORMAT == "gzip":
+        print("Writing gzipped CSV report...")
+        archive_path = os.path.join(reports_dir, f"{report_name}.csv.gz")
+        archive_data = write_report_gzip(archive_path, loans)
     else:
-        with smtplib.SMTP_SSL(config.SMTP_HOST, config.SMTP_PORT) as server:
-            server.login(config.SMTP_USERNAME, config.SMTP_PASSWORD)
-            server.send_message(msg)
+        print("Writing zipped CSV report...")
+        archive_path = os.path.join(reports_dir, f"{report_name}.zip")
+        csv_name = f"Loans_Due_Next_7_Days_{today_str}.csv"
+        archive_data = write_report_zip(archive_path, csv_name, loans)
 
+    attachments = [(archive_path, archive_data)]
 
-def main():
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    today_str = datetime.now().strftime("%Y-%m-%d")
+    if config.ATTACH_PARQUET:
+        print("Writing Parquet copy of the report...")
+        parquet_path = os.path.join(reports_dir, f"{report_name}.parquet")
+        attachments.append((parquet_path, write_report_parquet(parquet_path, loans)))
 
-    print("Connecting to SQL Server...")
-    conn = connect_sql_server()
+    return attachments, totals.count, totals.amount
 
-    print("Fetching loans due in next 7 days...")
-    loans = fetch_loans_due_next_7_days(conn)
-    conn.close()
 
-    folder_name, folder_path = create_report_folder(base_dir, today_str)
+async def run(base_dir, today_str):
+    # The SQL fetch + archive build and the SMTP connect/STARTTLS/login are
+    # independent and both mostly wait on the network, so overlap them.
+    report, server = await asyncio.gather(
+        asyncio.to_thread(build_report, base_dir, today_str),
+        asyncio.to_thread(get_smtp),
+        return_exceptions=True,
+    )
+    if isinstance(report, Exception):
+        raise report
+    if isinstance(server, Exception):
+        raise server
+
+    attachments, total_loans, total_amount = report
+    print("Sending email via SMTP...")
+    send_email(server, attachments, today_str, total_loans, total_amount)
 
-    print("Generating CSV report...")
-    csv_path, total_loans, total_amount = generate_csv(folder_path, today_str, loans)
+    return [path for path, _ in attachments]
 
-    reports_dir = os.path.join(base_dir, "reports")
 
-    print("Zipping report folder...")
-    zip_path = zip_folder(reports_dir, folder_name, folder_path)
+def main():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    today_str = datetime.now().strftime("%Y-%m-%d")
 
-    print("Sending email via SMTP...")
-    send_email(zip_path, today_str, total_loans, total_amount)
+    try:
+        report_paths = asyncio.run(run(base_dir, today_str))
+    finally:
+        close_sql_connection()
+        close_smtp()
 
-    print("✅ DONE: Report generated + zipped + emailed successfully!")
-    print(f"CSV: {csv_path}")
-    print(f"ZIP: {zip_path}")
+    print("✅ DONE: Report generated + compressed + emailed successfully!")
+    for path in report_paths:
+        print(f"Attached: {path}")
 
 
 if __name__ == "__main__":
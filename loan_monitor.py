@@ -10,20 +10,28 @@
 import sqlite3
 import smtplib
 import os
+import time
+import shutil
+import hashlib
+import queue
 import configparser
 import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+from types import SimpleNamespace
+from email.message import EmailMessage
 
+import numpy as np
 import pandas as pd
-import openpyxl
-from openpyxl.styles import (
-    Font, PatternFill, Alignment, Border, Side, numbers
-)
-from openpyxl.utils import get_column_letter
+
+# Copy-on-write is always on in pandas 3, which deprecates the option itself
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
 
 # ── Logging setup ────────────────────────────────────────────
 logging.basicConfig(
@@ -41,12 +49,58 @@ log = logging.getLogger(__name__)
 #  1. CONFIGURATION
 # ─────────────────────────────────────────────────────────────
 
-def load_config(path="config.ini") -> configparser.ConfigParser:
+@dataclass(frozen=True)
+class AppConfig:
+    """Every setting the monitor reads from config.ini, parsed once."""
+    # [DATABASE]
+    db_type: str
+    db_path: str
+    db_host: Optional[str]
+    db_port: Optional[int]
+    db_name: Optional[str]
+    db_user: Optional[str]
+    db_password: Optional[str]
+    # [EMAIL]
+    smtp_server: str
+    smtp_port: int
+    sender_email: str
+    sender_password: str
+    recipient_email: str
+    recipient_name: str
+    email_subject: str
+    company_name: str
+    # [REPORT]
+    days_lookahead: int
+    include_overdue: bool
+    save_local_copy: bool
+
+
+@lru_cache(maxsize=None)
+def load_config(path="config.ini") -> AppConfig:
     cfg = configparser.ConfigParser()
     if not os.path.exists(path):
         raise FileNotFoundError(f"Config file not found: {path}")
     cfg.read(path)
-    return cfg
+    return AppConfig(
+        db_type=cfg.get("DATABASE", "db_type", fallback="sqlite").lower(),
+        db_path=cfg.get("DATABASE", "db_path", fallback="loans.db"),
+        db_host=cfg.get("DATABASE", "db_host", fallback=None),
+        db_port=cfg.getint("DATABASE", "db_port", fallback=None),
+        db_name=cfg.get("DATABASE", "db_name", fallback=None),
+        db_user=cfg.get("DATABASE", "db_user", fallback=None),
+        db_password=cfg.get("DATABASE", "db_password", fallback=None),
+        smtp_server=cfg.get("EMAIL", "smtp_server", fallback="smtp.gmail.com"),
+        smtp_port=cfg.getint("EMAIL", "smtp_port", fallback=587),
+        sender_email=cfg.get("EMAIL", "sender_email"),
+        sender_password=cfg.get("EMAIL", "sender_password"),
+        recipient_email=cfg.get("EMAIL", "recipient_email"),
+        recipient_name=cfg.get("EMAIL", "recipient_name", fallback="Credit and Loans Department"),
+        email_subject=cfg.get("EMAIL", "email_subject", fallback="Loan Due Date Alert"),
+        company_name=cfg.get("EMAIL", "company_name", fallback="Loan Management System"),
+        days_lookahead=cfg.getint("REPORT", "days_lookahead", fallback=7),
+        include_overdue=cfg.getboolean("REPORT", "include_overdue", fallback=True),
+        save_local_copy=cfg.getboolean("REPORT", "save_local_copy", fallback=True),
+    )
 
 
 # ─────────────────────────────────────────────────────────────
@@ -56,56 +110,150 @@ def load_config(path="config.ini") -> configparser.ConfigParser:
 def setup_demo_database(db_path: str):
     """Creates and seeds a demo SQLite database from the SQL schema file."""
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
     with open("loan_schema.sql", "r") as f:
         sql = f.read()
-    # Execute statement by statement
-    for statement in sql.split(";"):
-        stmt = statement.strip()
-        if stmt:
-            try:
-                cursor.execute(stmt)
-            except sqlite3.OperationalError:
-                pass  # Table/data already exists
-    conn.commit()
+    # Freshly created demo file, so skip fsyncs while seeding. executescript
+    # commits anything pending before it starts, hence BEGIN/COMMIT inside it.
+    conn.execute("PRAGMA synchronous=OFF")
+    try:
+        conn.executescript(f"BEGIN IMMEDIATE;\n{sql}\nCOMMIT;")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    except sqlite3.Error:
+        conn.rollback()
+        conn.close()
+        os.remove(db_path)  # don't leave an empty file that looks seeded
+        raise
     conn.close()
     log.info(f"Demo database ready: {db_path}")
 
 
-def get_db_connection(cfg: configparser.ConfigParser):
-    db_type = cfg.get("DATABASE", "db_type", fallback="sqlite").lower()
+# WAL lets the report read while another process writes; mmap and a 64 MiB
+# page cache keep the join in memory instead of issuing pread() per page.
+# WAL persists in the file, but the rest are per connection: they do not
+# reach connectorx's own connection when fetch_due_loans reads through it.
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+    "cache_size=-65536",
+)
+
+
+def get_db_connection(cfg: AppConfig):
+    db_type = cfg.db_type
 
     if db_type == "sqlite":
-        db_path = cfg.get("DATABASE", "db_path", fallback="loans.db")
+        db_path = cfg.db_path
         if not os.path.exists(db_path):
             log.info("Database not found – creating demo database...")
             setup_demo_database(db_path)
-        return sqlite3.connect(db_path)
+        # Pooled connections may be borrowed from any thread, one at a time
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(f"PRAGMA {pragma}")
+        return conn
 
     elif db_type == "mysql":
         import mysql.connector
         return mysql.connector.connect(
-            host=cfg.get("DATABASE", "db_host"),
-            port=cfg.getint("DATABASE", "db_port", fallback=3306),
-            database=cfg.get("DATABASE", "db_name"),
-            user=cfg.get("DATABASE", "db_user"),
-            password=cfg.get("DATABASE", "db_password")
+            host=cfg.db_host,
+            port=cfg.db_port or 3306,
+            database=cfg.db_name,
+            user=cfg.db_user,
+            password=cfg.db_password
         )
 
     elif db_type == "postgresql":
         import psycopg2
         return psycopg2.connect(
-            host=cfg.get("DATABASE", "db_host"),
-            port=cfg.getint("DATABASE", "db_port", fallback=5432),
-            dbname=cfg.get("DATABASE", "db_name"),
-            user=cfg.get("DATABASE", "db_user"),
-            password=cfg.get("DATABASE", "db_password")
+            host=cfg.db_host,
+            port=cfg.db_port or 5432,
+            dbname=cfg.db_name,
+            user=cfg.db_user,
+            password=cfg.db_password
         )
 
     else:
         raise ValueError(f"Unsupported db_type: {db_type}")
 
 
+# Column order of the frame fetch_due_loans returns
+REPORT_COLUMNS = [
+    "Customer Name",
+    "Loan ID",
+    "Amount Borrowed",
+    "Outstanding Balance",
+    "Due Date",
+    "Days Remaining",
+    "Phone Number",
+    "Email",
+    "Loan Officer / Branch",
+    "Loan Status",
+]
+
+
+def _connectorx():
+    """connectorx (optional, imported on first use): columnar reads straight into Arrow."""
+    try:
+        import connectorx
+    except ImportError:
+        return None
+    return connectorx
+
+
+def _sqlite_file(conn) -> str:
+    """Path of an SQLite connection's main database ("" if in-memory or not SQLite)."""
+    if not isinstance(conn, sqlite3.Connection):
+        return ""
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+
+DB_POOL_SIZE = 4    # idle read connections kept per configuration
+_DB_POOLS = {}      # AppConfig -> queue.Queue of open connections
+
+
+@contextmanager
+def borrow_conn(cfg: AppConfig):
+    """
+    Yields a read connection from the pool for `cfg`, opening one if the
+    pool is empty, and returns it afterwards. A connection that raised is
+    closed rather than handed to the next caller.
+
+    The read's implicit transaction is rolled back before the connection
+    goes back: with autocommit off (the mysql.connector and psycopg2
+    default) the next borrower would otherwise keep reading that
+    transaction's snapshot, and the server sees the session as idle in
+    transaction.
+    """
+    pool = _DB_POOLS.setdefault(cfg, queue.Queue(maxsize=DB_POOL_SIZE))
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = get_db_connection(cfg)
+    try:
+        yield conn
+        conn.rollback()
+    except BaseException:
+        conn.close()
+        raise
+    try:
+        pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+def close_db_pool():
+    """Closes every idle pooled connection."""
+    for pool in _DB_POOLS.values():
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+    _DB_POOLS.clear()
+
+
 def fetch_due_loans(conn, days_ahead: int = 7, include_overdue: bool = True) -> pd.DataFrame:
     """
     Pulls loans due within `days_ahead` days (and optionally overdue loans).
@@ -119,6 +267,14 @@ def fetch_due_loans(conn, days_ahead: int = 7, include_overdue: bool = True) ->
     else:
         due_filter = "l.due_date BETWEEN :today AND :cutoff"
 
+    # loan_schema.sql's CHECK limits SQLite statuses to Active/Overdue/Paid, so
+    # the IN list is the same filter in a form idx_loans_due_status can seek on.
+    # Other databases may carry further statuses; keep the original != 'Paid'.
+    if isinstance(conn, sqlite3.Connection):
+        status_filter = "l.loan_status IN ('Active', 'Overdue')"
+    else:
+        status_filter = "l.loan_status != 'Paid'"
+
     query = f"""
         SELECT
             c.full_name            AS "Customer Name",
@@ -135,39 +291,87 @@ def fetch_due_loans(conn, days_ahead: int = 7, include_overdue: bool = True) ->
         JOIN customers c ON l.customer_id = c.customer_id
         JOIN branches  b ON l.branch_id   = b.branch_id
         WHERE {due_filter}
-          AND l.loan_status != 'Paid'
+          AND {status_filter}
         ORDER BY l.due_date ASC
     """
 
     params = {"cutoff": str(cutoff), "today": str(today)}
-    df = pd.read_sql_query(query, conn, params=params)
+    db_file = _sqlite_file(conn)
+    cx = _connectorx() if db_file else None
+    df = None
+    if cx is not None:
+        # connectorx reads through its own connection to the same file, so
+        # `conn` (and its SQLITE_PRAGMAS / pool reuse) serves only as the path
+        # lookup here; the tuned connection does the read on the fallback path.
+        # connectorx takes no bind parameters; both values are ISO dates we built.
+        # It URL-decodes the path, so a literal "%" (or space) must be quoted.
+        literal_query = query.replace(":cutoff", f"'{cutoff}'").replace(":today", f"'{today}'")
+        try:
+            df = cx.read_sql(f"sqlite://{quote(db_file)}", literal_query, return_type="arrow").to_pandas()
+        except Exception as e:
+            log.warning(f"connectorx read failed ({e}); falling back to pandas.read_sql_query")
+    if df is None:
+        df = pd.read_sql_query(query, conn, params=params)
+
+    if df.empty:
+        log.info(f"Fetched 0 loans due within {days_ahead} days.")
+        return df.reindex(columns=REPORT_COLUMNS)
 
-    # Calculate Days Remaining (negative = overdue)
-    df["Due Date"] = pd.to_datetime(df["Due Date"]).dt.date
-    df["Days Remaining"] = df["Due Date"].apply(lambda d: (d - today).days)
+    # Calculate Days Remaining (negative = overdue) on the datetime64 column
+    # before converting to plain dates for display
+    due = pd.to_datetime(df["Due Date"])
+    df["Due Date"] = due.dt.date
+    df["Days Remaining"] = (due.dt.normalize() - pd.Timestamp(today)).dt.days.astype("int32")
 
     # Combine Loan Officer + Branch
-    df["Loan Officer / Branch"] = df["Loan Officer"] + " / " + df["Branch"]
+    df["Loan Officer / Branch"] = df["Loan Officer"].str.cat(df["Branch"], sep=" / ")
     df.drop(columns=["Loan Officer", "Branch"], inplace=True)
 
     # Reorder columns to match spec
-    df = df[[
-        "Customer Name",
-        "Loan ID",
-        "Amount Borrowed",
-        "Outstanding Balance",
-        "Due Date",
-        "Days Remaining",
-        "Phone Number",
-        "Email",
-        "Loan Officer / Branch",
-        "Loan Status"
-    ]]
+    df = df[REPORT_COLUMNS]
+
+    # Few distinct values over many rows: store as small integer codes
+    df = df.astype({"Loan Status": "category", "Loan Officer / Branch": "category"})
 
     log.info(f"Fetched {len(df)} loans due within {days_ahead} days.")
     return df
 
 
+# Days Remaining bucket edges: <0 overdue, 0 today, 1-3, 4-7, 8+ later
+_DUE_BUCKET_EDGES = np.array([0, 1, 4, 8])
+_BUCKET_OVERDUE, _BUCKET_TODAY, _BUCKET_1_3, _BUCKET_4_7, _BUCKET_LATER = range(5)
+
+
+def _compute_summary(df: pd.DataFrame, today: date) -> SimpleNamespace:
+    """
+    Computes every count and total shown in the Excel summary sheet and the
+    email header in one pass per column, instead of re-filtering `df` per figure.
+    """
+    days = df["Days Remaining"].to_numpy()
+    outstanding = df["Outstanding Balance"].to_numpy()
+    by_bucket = np.bincount(np.searchsorted(_DUE_BUCKET_EDGES, days, side="right"), minlength=5)
+
+    status_codes, statuses = pd.factorize(df["Loan Status"])
+    status_count = dict(zip(statuses, np.bincount(status_codes, minlength=len(statuses)).tolist()))
+    # NULL balances (possible on MySQL/PostgreSQL) count as 0, as pandas .sum() does
+    status_sum = dict(zip(statuses, np.bincount(status_codes, weights=np.nan_to_num(outstanding),
+                                                minlength=len(statuses)).tolist()))
+
+    return SimpleNamespace(
+        report_date=today,
+        total_count=len(df),
+        active_count=status_count.get("Active", 0),
+        overdue_count=status_count.get("Overdue", 0),
+        due_today=int(by_bucket[_BUCKET_TODAY]),
+        due_1_3=int(by_bucket[_BUCKET_1_3]),
+        due_4_7=int(by_bucket[_BUCKET_4_7]),
+        already_overdue=int(by_bucket[_BUCKET_OVERDUE]),
+        total_borrowed=float(df["Amount Borrowed"].sum()),
+        total_outstanding=float(np.nansum(outstanding)),
+        overdue_outstanding=float(status_sum.get("Overdue", 0.0)),
+    )
+
+
 # ─────────────────────────────────────────────────────────────
 #  3. EXCEL REPORT GENERATION
 # ─────────────────────────────────────────────────────────────
@@ -181,120 +385,116 @@ CLR_ALT_ROW      = "F5F8FF"   # Very light blue
 CLR_TITLE_BG     = "2E75B6"   # Medium blue
 CLR_SUMMARY_BG   = "EBF3FB"   # Pale blue
 
-THIN_BORDER = Border(
-    left=Side(style="thin", color="CCCCCC"),
-    right=Side(style="thin", color="CCCCCC"),
-    top=Side(style="thin", color="CCCCCC"),
-    bottom=Side(style="thin", color="CCCCCC"),
-)
+THIN_BORDER = {"border": 1, "border_color": "#CCCCCC"}
 
 
-def _fill(hex_color: str) -> PatternFill:
-    return PatternFill("solid", start_color=hex_color, end_color=hex_color)
+def _fill(hex_color: str) -> dict:
+    return {"pattern": 1, "bg_color": f"#{hex_color}"}
 
 
-def _font(bold=False, color="000000", size=10, italic=False) -> Font:
-    return Font(bold=bold, color=color, size=size, italic=italic, name="Arial")
+def _font(bold=False, color="000000", size=10, italic=False) -> dict:
+    return {"bold": bold, "font_color": f"#{color}", "font_size": size, "italic": italic, "font_name": "Arial"}
 
 
-def generate_excel_report(df: pd.DataFrame, company_name: str) -> str:
-    """Builds a styled Excel report and returns the file path."""
-    today = date.today()
-    report_dir = "reports"
-    os.makedirs(report_dir, exist_ok=True)
-    filename = f"{report_dir}/Loans_Due_Report_{today.strftime('%Y%m%d')}.xlsx"
+# Cell property dicts shared by every workbook. xlsxwriter still needs one
+# Format per workbook, but the dicts themselves are built only at import.
+_FILL_OVERDUE = _fill(CLR_OVERDUE_BG)
+_FILL_ALT     = _fill(CLR_ALT_ROW)
+_FILL_WHITE   = _fill("FFFFFF")
 
-    wb = openpyxl.Workbook()
+_FONT_PLAIN_10     = _font(size=10)
+_FONT_OVERDUE_RED  = _font(bold=True, color="CC0000", size=10)
+_FONT_WARN_ORANGE  = _font(bold=True, color="E65100", size=10)
+_FONT_ACTIVE_GREEN = _font(bold=True, color="1B7A1B", size=10)
 
-    # ── Sheet 1: Loan Detail ──────────────────────────────────
-    ws = wb.active
-    ws.title = "Loans Due This Week"
-    ws.sheet_view.showGridLines = False
+_ALIGN_LEFT_CENTER   = {"valign": "vcenter"}
+_ALIGN_RIGHT_CENTER  = {"align": "right", "valign": "vcenter"}
+_ALIGN_CENTER_CENTER = {"align": "center", "valign": "vcenter"}
 
-    col_count = len(df.columns)
+# Data-row cell kinds (see _build_formats) minus the row tint
+_ROW_KINDS = {
+    "text":           {**_FONT_PLAIN_10, **_ALIGN_LEFT_CENTER, "text_wrap": True},
+    "currency":       {"num_format": "#,##0.00", **_ALIGN_RIGHT_CENTER},
+    "date":           _ALIGN_CENTER_CENTER,
+    "days_overdue":   {**_ALIGN_CENTER_CENTER, **_FONT_OVERDUE_RED},
+    "days_soon":      {**_ALIGN_CENTER_CENTER, **_FONT_WARN_ORANGE},
+    "days":           {**_ALIGN_CENTER_CENTER, **_FONT_PLAIN_10},
+    "status_overdue": {**_ALIGN_CENTER_CENTER, **_FONT_OVERDUE_RED},
+    "status_active":  {**_ALIGN_CENTER_CENTER, **_FONT_ACTIVE_GREEN},
+}
+_ROW_TINTS = {CLR_OVERDUE_BG: _FILL_OVERDUE, CLR_ALT_ROW: _FILL_ALT, "FFFFFF": _FILL_WHITE}
 
-    # --- Title Block ---
-    ws.merge_cells(f"A1:{get_column_letter(col_count)}1")
-    title_cell = ws["A1"]
-    title_cell.value = f"📋  {company_name.upper()}  –  LOAN DUE DATE ALERT"
-    title_cell.font = _font(bold=True, color=CLR_HEADER_FG, size=14)
-    title_cell.fill = _fill(CLR_TITLE_BG)
-    title_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.row_dimensions[1].height = 30
-
-    ws.merge_cells(f"A2:{get_column_letter(col_count)}2")
-    sub_cell = ws["A2"]
-    sub_cell.value = (
-        f"Report Generated: {today.strftime('%A, %d %B %Y')}  |  "
-        f"Loans Due: {today.strftime('%d %b')} – {(today + timedelta(days=7)).strftime('%d %b %Y')}  |  "
-        f"Total Records: {len(df)}"
+# Highlight kinds picked per row by the index arrays in generate_excel_report
+DAYS_KINDS   = ("days_overdue", "days_soon", "days")
+STATUS_KINDS = ("status_overdue", "status_active")
+
+
+def _build_formats(wb) -> dict:
+    """
+    Creates every cell format the report uses, once per workbook.
+    Data-row formats are keyed by row tint, then by the kind of cell.
+    """
+    center = _ALIGN_CENTER_CENTER
+
+    formats = {
+        "title":    wb.add_format({**_font(bold=True, color=CLR_HEADER_FG, size=14), **_fill(CLR_TITLE_BG), **center}),
+        "subtitle": wb.add_format({**_font(italic=True, color="FFFFFF", size=9), **_fill("2E75B6"), **center}),
+        "header":   wb.add_format({**_font(bold=True, color=CLR_HEADER_FG, size=10), **_fill(CLR_HEADER_BG),
+                                   **center, "text_wrap": True, **THIN_BORDER}),
+        "spacer":   wb.add_format(),
+        "rows": {
+            tint: {kind: wb.add_format({**fill, **THIN_BORDER, **props}) for kind, props in _ROW_KINDS.items()}
+            for tint, fill in _ROW_TINTS.items()
+        },
+    }
+
+    summary_section = {**_font(bold=True, color=CLR_HEADER_FG, size=10), **_fill(CLR_HEADER_BG), **THIN_BORDER}
+    summary_blank = {**_fill("FFFFFF"), **THIN_BORDER}
+    formats["summary_title"] = wb.add_format({**_font(bold=True, color=CLR_HEADER_FG, size=13),
+                                              **_fill(CLR_TITLE_BG), **center})
+    formats["summary_section"] = (
+        wb.add_format({**summary_section, "valign": "vcenter"}),
+        wb.add_format({**summary_section, **center}),
+    )
+    formats["summary_blank"] = (
+        wb.add_format({**summary_blank, "valign": "vcenter"}),
+        wb.add_format({**summary_blank, **center}),
     )
-    sub_cell.font = _font(italic=True, color="FFFFFF", size=9)
-    sub_cell.fill = _fill("2E75B6")
-    sub_cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.row_dimensions[2].height = 18
+    formats["summary_rows"] = {
+        bg: (
+            wb.add_format({**_fill(bg), **THIN_BORDER, **_font(size=10), "valign": "vcenter"}),
+            wb.add_format({**_fill(bg), **THIN_BORDER, **_font(bold=True, size=10), **center}),
+        )
+        for bg in (CLR_SUMMARY_BG, "FFFFFF")
+    }
+    return formats
 
-    # Blank spacer row
-    ws.row_dimensions[3].height = 6
 
-    # --- Column Headers (row 4) ---
-    for col_idx, col_name in enumerate(df.columns, start=1):
-        cell = ws.cell(row=4, column=col_idx, value=col_name)
-        cell.font = _font(bold=True, color=CLR_HEADER_FG, size=10)
-        cell.fill = _fill(CLR_HEADER_BG)
-        cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-        cell.border = THIN_BORDER
-    ws.row_dimensions[4].height = 32
+REPORT_DIR = "reports"
 
-    # --- Data Rows ---
-    for row_idx, row in enumerate(df.itertuples(index=False), start=5):
-        status = row._9  # "Loan Status" column (0-indexed position 9)
-        days_remaining = row._5  # "Days Remaining" column
-
-        # Row background: overdue = red tint, active = alternating
-        if status == "Overdue" or days_remaining < 0:
-            row_fill = _fill(CLR_OVERDUE_BG)
-        elif row_idx % 2 == 0:
-            row_fill = _fill(CLR_ALT_ROW)
-        else:
-            row_fill = _fill("FFFFFF")
 
-        for col_idx, value in enumerate(row, start=1):
-            cell = ws.cell(row=row_idx, column=col_idx)
-            cell.fill = row_fill
-            cell.border = THIN_BORDER
-            cell.alignment = Alignment(vertical="center", wrap_text=True)
+def report_path_for(report_date: date) -> str:
+    """Path of the day's Excel report, creating the reports folder if needed."""
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    return f"{REPORT_DIR}/Loans_Due_Report_{report_date.strftime('%Y%m%d')}.xlsx"
 
-            col_name = df.columns[col_idx - 1]
 
-            if col_name in ("Amount Borrowed", "Outstanding Balance"):
-                cell.value = value
-                cell.number_format = '#,##0.00'
-                cell.alignment = Alignment(horizontal="right", vertical="center")
-            elif col_name == "Due Date":
-                cell.value = str(value)
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-            elif col_name == "Days Remaining":
-                cell.value = value
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-                if value < 0:
-                    cell.font = _font(bold=True, color="CC0000", size=10)
-                elif value <= 3:
-                    cell.font = _font(bold=True, color="E65100", size=10)
-                else:
-                    cell.font = _font(size=10)
-            elif col_name == "Loan Status":
-                cell.value = value
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-                if value == "Overdue":
-                    cell.font = _font(bold=True, color="CC0000", size=10)
-                else:
-                    cell.font = _font(bold=True, color="1B7A1B", size=10)
-            else:
-                cell.value = value
-                cell.font = _font(size=10)
+def generate_excel_report(df: pd.DataFrame, company_name: str, summary: SimpleNamespace) -> str:
+    """Builds a styled Excel report and returns the file path."""
+    today = summary.report_date
+    filename = report_path_for(today)
 
-        ws.row_dimensions[row_idx].height = 20
+    # constant_memory streams each row to disk as soon as the next one starts,
+    # so rows (and merged ranges) must be written strictly top to bottom.
+    import xlsxwriter
+    wb = xlsxwriter.Workbook(filename, {"constant_memory": True, "strings_to_numbers": False})
+    fmt = _build_formats(wb)
+
+    # ── Sheet 1: Loan Detail ──────────────────────────────────
+    ws = wb.add_worksheet("Loans Due This Week")
+    ws.hide_gridlines(2)
+
+    col_count = len(df.columns)
 
     # --- Column Widths ---
     col_widths = {
@@ -309,76 +509,116 @@ def generate_excel_report(df: pd.DataFrame, company_name: str) -> str:
         "Loan Officer / Branch": 28,
         "Loan Status": 14,
     }
-    for col_idx, col_name in enumerate(df.columns, start=1):
-        ws.column_dimensions[get_column_letter(col_idx)].width = col_widths.get(col_name, 16)
+    for col_idx, col_name in enumerate(df.columns):
+        ws.set_column(col_idx, col_idx, col_widths.get(col_name, 16))
+
+    # --- Title Block ---
+    ws.set_row(0, 30)
+    ws.merge_range(0, 0, 0, col_count - 1,
+                   f"📋  {company_name.upper()}  –  LOAN DUE DATE ALERT", fmt["title"])
+
+    ws.set_row(1, 18)
+    ws.merge_range(1, 0, 1, col_count - 1, (
+        f"Report Generated: {today.strftime('%A, %d %B %Y')}  |  "
+        f"Loans Due: {today.strftime('%d %b')} – {(today + timedelta(days=7)).strftime('%d %b %Y')}  |  "
+        f"Total Records: {len(df)}"
+    ), fmt["subtitle"])
+
+    # Blank spacer row. constant_memory drops rows with no cells, height
+    # included, so it needs a (plain) blank cell to be written at all.
+    ws.set_row(2, 6)
+    ws.write_blank(2, 0, None, fmt["spacer"])
+
+    # --- Column Headers (row 4) ---
+    ws.set_row(3, 32)
+    ws.write_row(3, 0, df.columns, fmt["header"])
+
+    # --- Data Rows ---
+    # One list per column (native Python scalars), indexed by row below
+    cols = df.columns.tolist()
+    arrs = [df[c].tolist() for c in cols]
+
+    # Decide every row tint and highlight up front; the loop only indexes.
+    # Row background: overdue = red tint, otherwise alternating (odd i lands
+    # on an even-numbered Excel row).
+    days = df["Days Remaining"].to_numpy()
+    status_overdue = df["Loan Status"].eq("Overdue").to_numpy()
+    tints = (fmt["rows"][CLR_OVERDUE_BG], fmt["rows"][CLR_ALT_ROW], fmt["rows"]["FFFFFF"])
+    tint_idx = np.where(status_overdue | (days < 0), 0, np.where(np.arange(len(df)) % 2 == 1, 1, 2)).tolist()
+    days_idx = np.where(days < 0, 0, np.where(days <= 3, 1, 2)).tolist()
+    status_idx = np.where(status_overdue, 0, 1).tolist()
+
+    for i in range(len(df)):
+        row_idx = i + 4
+        row_fmt = tints[tint_idx[i]]
+
+        ws.set_row(row_idx, 20)
+
+        for col_idx, col_name in enumerate(cols):
+            value = arrs[col_idx][i]
+
+            if col_name in ("Amount Borrowed", "Outstanding Balance"):
+                # NULL balances (MySQL/PostgreSQL) stay empty cells; write_number rejects NaN
+                if pd.isna(value):
+                    ws.write_blank(row_idx, col_idx, None, row_fmt["currency"])
+                else:
+                    ws.write_number(row_idx, col_idx, value, row_fmt["currency"])
+            elif col_name == "Due Date":
+                ws.write_string(row_idx, col_idx, str(value), row_fmt["date"])
+            elif col_name == "Days Remaining":
+                ws.write_number(row_idx, col_idx, value, row_fmt[DAYS_KINDS[days_idx[i]]])
+            elif col_name == "Loan Status":
+                ws.write_string(row_idx, col_idx, value, row_fmt[STATUS_KINDS[status_idx[i]]])
+            else:
+                ws.write(row_idx, col_idx, value, row_fmt["text"])
 
     # Freeze header rows
-    ws.freeze_panes = "A5"
+    ws.freeze_panes(4, 0)
 
     # ── Sheet 2: Summary ─────────────────────────────────────
-    ws2 = wb.create_sheet("Summary")
-    ws2.sheet_view.showGridLines = False
-    ws2.column_dimensions["A"].width = 30
-    ws2.column_dimensions["B"].width = 20
-
-    summary_title = ws2["A1"]
-    summary_title.value = "LOAN REPORT SUMMARY"
-    summary_title.font = _font(bold=True, color=CLR_HEADER_FG, size=13)
-    summary_title.fill = _fill(CLR_TITLE_BG)
-    summary_title.alignment = Alignment(horizontal="center", vertical="center")
-    ws2.merge_cells("A1:B1")
-    ws2.row_dimensions[1].height = 28
-
-    overdue_df = df[df["Loan Status"] == "Overdue"]
-    active_df  = df[df["Loan Status"] == "Active"]
+    ws2 = wb.add_worksheet("Summary")
+    ws2.hide_gridlines(2)
+    ws2.set_column(0, 0, 30)
+    ws2.set_column(1, 1, 20)
+
+    ws2.set_row(0, 28)
+    ws2.merge_range(0, 0, 0, 1, "LOAN REPORT SUMMARY", fmt["summary_title"])
 
     summary_data = [
         ("Report Date",                today.strftime("%d %B %Y")),
         ("Reporting Period",            f"Next 7 Days + Overdue"),
         ("", ""),
         ("LOAN COUNTS", ""),
-        ("Total Loans in Report",       len(df)),
-        ("Active Loans",                len(active_df)),
-        ("Overdue Loans",               len(overdue_df)),
+        ("Total Loans in Report",       summary.total_count),
+        ("Active Loans",                summary.active_count),
+        ("Overdue Loans",               summary.overdue_count),
         ("", ""),
         ("FINANCIAL SUMMARY", ""),
-        ("Total Amount Borrowed (KES)", f"{df['Amount Borrowed'].sum():,.2f}"),
-        ("Total Outstanding (KES)",     f"{df['Outstanding Balance'].sum():,.2f}"),
-        ("Overdue Outstanding (KES)",   f"{overdue_df['Outstanding Balance'].sum():,.2f}"),
+        ("Total Amount Borrowed (KES)", f"{summary.total_borrowed:,.2f}"),
+        ("Total Outstanding (KES)",     f"{summary.total_outstanding:,.2f}"),
+        ("Overdue Outstanding (KES)",   f"{summary.overdue_outstanding:,.2f}"),
         ("", ""),
         ("DUE THIS WEEK", ""),
-        ("Due Today",                   len(df[df["Days Remaining"] == 0])),
-        ("Due in 1-3 Days",             len(df[(df["Days Remaining"] >= 1) & (df["Days Remaining"] <= 3)])),
-        ("Due in 4-7 Days",             len(df[(df["Days Remaining"] >= 4) & (df["Days Remaining"] <= 7)])),
-        ("Already Overdue",             len(df[df["Days Remaining"] < 0])),
+        ("Due Today",                   summary.due_today),
+        ("Due in 1-3 Days",             summary.due_1_3),
+        ("Due in 4-7 Days",             summary.due_4_7),
+        ("Already Overdue",             summary.already_overdue),
     ]
 
-    for r_idx, (label, value) in enumerate(summary_data, start=2):
-        label_cell = ws2.cell(row=r_idx, column=1, value=label)
-        value_cell = ws2.cell(row=r_idx, column=2, value=value)
-
+    for r_idx, (label, value) in enumerate(summary_data, start=1):
         if label in ("LOAN COUNTS", "FINANCIAL SUMMARY", "DUE THIS WEEK"):
-            label_cell.font = _font(bold=True, color=CLR_HEADER_FG, size=10)
-            value_cell.font = _font(bold=True, color=CLR_HEADER_FG, size=10)
-            label_cell.fill = _fill(CLR_HEADER_BG)
-            value_cell.fill = _fill(CLR_HEADER_BG)
+            label_fmt, value_fmt = fmt["summary_section"]
         elif label == "":
-            label_cell.fill = _fill("FFFFFF")
-            value_cell.fill = _fill("FFFFFF")
+            label_fmt, value_fmt = fmt["summary_blank"]
         else:
-            bg = CLR_SUMMARY_BG if r_idx % 2 == 0 else "FFFFFF"
-            label_cell.fill = _fill(bg)
-            value_cell.fill = _fill(bg)
-            label_cell.font = _font(size=10)
-            value_cell.font = _font(bold=True, size=10)
-
-        label_cell.border = THIN_BORDER
-        value_cell.border = THIN_BORDER
-        label_cell.alignment = Alignment(vertical="center")
-        value_cell.alignment = Alignment(horizontal="center", vertical="center")
-        ws2.row_dimensions[r_idx].height = 20
-
-    wb.save(filename)
+            bg = CLR_SUMMARY_BG if r_idx % 2 == 1 else "FFFFFF"
+            label_fmt, value_fmt = fmt["summary_rows"][bg]
+
+        ws2.set_row(r_idx, 20)
+        ws2.write(r_idx, 0, label, label_fmt)
+        ws2.write(r_idx, 1, value, value_fmt)
+
+    wb.close()
     log.info(f"Excel report saved: {filename}")
     return filename
 
@@ -387,41 +627,19 @@ def generate_excel_report(df: pd.DataFrame, company_name: str) -> str:
 #  4. EMAIL — BUILD & SEND
 # ─────────────────────────────────────────────────────────────
 
-def build_email_body(df: pd.DataFrame, company_name: str) -> str:
-    today = date.today()
-    overdue_count  = len(df[df["Loan Status"] == "Overdue"])
-    active_count   = len(df[df["Loan Status"] == "Active"])
-    total_outstanding = df["Outstanding Balance"].sum()
-    overdue_outstanding = df[df["Loan Status"] == "Overdue"]["Outstanding Balance"].sum()
-
-    rows_html = ""
-    for _, row in df.iterrows():
-        color = "#ffe0e0" if row["Loan Status"] == "Overdue" else ("#ffffff" if _ % 2 == 0 else "#f5f8ff")
-        days_display = (
-            f"<span style='color:red;font-weight:bold;'>{row['Days Remaining']} (Overdue)</span>"
-            if row["Days Remaining"] < 0
-            else f"<span style='color:{'#e65100' if row['Days Remaining'] <= 3 else '#1b7a1b'};font-weight:bold;'>{row['Days Remaining']}</span>"
-        )
-        status_color = "red" if row["Loan Status"] == "Overdue" else "green"
-        rows_html += f"""
-        <tr style="background-color:{color};">
-            <td>{row['Customer Name']}</td>
-            <td>{row['Loan ID']}</td>
-            <td style='text-align:right;'>KES {row['Amount Borrowed']:,.2f}</td>
-            <td style='text-align:right;'>KES {row['Outstanding Balance']:,.2f}</td>
-            <td style='text-align:center;'>{row['Due Date']}</td>
-            <td style='text-align:center;'>{days_display}</td>
-            <td>{row['Phone Number']}</td>
-            <td>{row['Loan Officer / Branch']}</td>
-            <td style='color:{status_color};font-weight:bold;text-align:center;'>{row['Loan Status']}</td>
-        </tr>"""
-
-    return f"""
+EMAIL_ROW_COLUMNS = [
+    "Customer Name", "Loan ID", "Amount Borrowed", "Outstanding Balance", "Due Date",
+    "Days Remaining", "Phone Number", "Loan Officer / Branch", "Loan Status",
+]
+
+
+# Compiled on first use (see _email_template); rows are tuples in EMAIL_ROW_COLUMNS order
+_EMAIL_TEMPLATE_SRC = """
     <html><body style="font-family:Arial, sans-serif; color:#222; font-size:14px;">
       <div style="background:#1F3864;color:white;padding:20px 30px;border-radius:6px 6px 0 0;">
-        <h2 style="margin:0;">📋 {company_name}</h2>
+        <h2 style="margin:0;">📋 {{ company_name }}</h2>
         <p style="margin:5px 0 0;">Loan Due Date Alert — Loans Due Within 7 Days</p>
-        <p style="margin:4px 0 0;font-size:12px;opacity:0.8;">Generated: {today.strftime('%A, %d %B %Y')}</p>
+        <p style="margin:4px 0 0;font-size:12px;opacity:0.8;">Generated: {{ summary.report_date.strftime('%A, %d %B %Y') }}</p>
       </div>
 
       <div style="background:#EBF3FB;padding:16px 30px;border:1px solid #cce0f5;">
@@ -429,23 +647,23 @@ def build_email_body(df: pd.DataFrame, company_name: str) -> str:
         <table style="border-collapse:collapse;width:100%;max-width:600px;">
           <tr>
             <td style="padding:6px 12px;background:#fff;border:1px solid #ddd;"><b>Total Loans in Report</b></td>
-            <td style="padding:6px 12px;background:#fff;border:1px solid #ddd;text-align:center;"><b>{len(df)}</b></td>
+            <td style="padding:6px 12px;background:#fff;border:1px solid #ddd;text-align:center;"><b>{{ summary.total_count }}</b></td>
           </tr>
           <tr>
             <td style="padding:6px 12px;background:#e8f5e9;border:1px solid #ddd;">Active Loans</td>
-            <td style="padding:6px 12px;background:#e8f5e9;border:1px solid #ddd;text-align:center;color:green;font-weight:bold;">{active_count}</td>
+            <td style="padding:6px 12px;background:#e8f5e9;border:1px solid #ddd;text-align:center;color:green;font-weight:bold;">{{ summary.active_count }}</td>
           </tr>
           <tr>
             <td style="padding:6px 12px;background:#ffe0e0;border:1px solid #ddd;">Overdue Loans</td>
-            <td style="padding:6px 12px;background:#ffe0e0;border:1px solid #ddd;text-align:center;color:red;font-weight:bold;">{overdue_count}</td>
+            <td style="padding:6px 12px;background:#ffe0e0;border:1px solid #ddd;text-align:center;color:red;font-weight:bold;">{{ summary.overdue_count }}</td>
           </tr>
           <tr>
             <td style="padding:6px 12px;background:#fff;border:1px solid #ddd;">Total Outstanding Balance</td>
-            <td style="padding:6px 12px;background:#fff;border:1px solid #ddd;text-align:center;"><b>KES {total_outstanding:,.2f}</b></td>
+            <td style="padding:6px 12px;background:#fff;border:1px solid #ddd;text-align:center;"><b>KES {{ summary.total_outstanding | money }}</b></td>
           </tr>
           <tr>
             <td style="padding:6px 12px;background:#ffe0e0;border:1px solid #ddd;">Overdue Outstanding</td>
-            <td style="padding:6px 12px;background:#ffe0e0;border:1px solid #ddd;text-align:center;color:red;font-weight:bold;">KES {overdue_outstanding:,.2f}</td>
+            <td style="padding:6px 12px;background:#ffe0e0;border:1px solid #ddd;text-align:center;color:red;font-weight:bold;">KES {{ summary.overdue_outstanding | money }}</td>
           </tr>
         </table>
       </div>
@@ -467,64 +685,171 @@ def build_email_body(df: pd.DataFrame, company_name: str) -> str:
             </tr>
           </thead>
           <tbody>
-            {rows_html}
+            {% for name, loan_id, borrowed, outstanding, due, days, phone, officer, status in rows %}
+        <tr style="background-color:{{ '#ffe0e0' if status == 'Overdue' else ('#ffffff' if loop.index0 is even else '#f5f8ff') }};">
+            <td>{{ name }}</td>
+            <td>{{ loan_id }}</td>
+            <td style='text-align:right;'>KES {{ borrowed | money }}</td>
+            <td style='text-align:right;'>KES {{ outstanding | money }}</td>
+            <td style='text-align:center;'>{{ due }}</td>
+            <td style='text-align:center;'>
+              {%- if days < 0 -%}
+                <span style='color:red;font-weight:bold;'>{{ days }} (Overdue)</span>
+              {%- else -%}
+                <span style='color:{{ '#e65100' if days <= 3 else '#1b7a1b' }};font-weight:bold;'>{{ days }}</span>
+              {%- endif -%}
+            </td>
+            <td>{{ phone }}</td>
+            <td>{{ officer }}</td>
+            <td style='color:{{ 'red' if status == 'Overdue' else 'green' }};font-weight:bold;text-align:center;'>{{ status }}</td>
+        </tr>{% endfor %}
           </tbody>
         </table>
       </div>
 
       <div style="background:#f0f0f0;padding:12px 30px;border-top:2px solid #1F3864;font-size:11px;color:#666;">
         ⚠️ This is an automated report. Please do not reply to this email.
-        Full details are in the attached Excel file. &nbsp;|&nbsp; {company_name} — Loan Monitoring System
+        Full details are in the attached Excel file. &nbsp;|&nbsp; {{ company_name }} — Loan Monitoring System
       </div>
     </body></html>
     """
 
 
-def send_email(cfg: configparser.ConfigParser, report_path: str, df: pd.DataFrame):
-    sender_email    = cfg.get("EMAIL", "sender_email")
-    sender_password = cfg.get("EMAIL", "sender_password")
-    recipient_email = cfg.get("EMAIL", "recipient_email")
-    recipient_name  = cfg.get("EMAIL", "recipient_name", fallback="Credit and Loans Department")
-    smtp_server     = cfg.get("EMAIL", "smtp_server", fallback="smtp.gmail.com")
-    smtp_port       = cfg.getint("EMAIL", "smtp_port", fallback=587)
-    subject         = cfg.get("EMAIL", "email_subject", fallback="Loan Due Date Alert")
-    company_name    = cfg.get("EMAIL", "company_name", fallback="Loan Management System")
+@lru_cache(maxsize=None)
+def _email_template():
+    """The email body template, compiled once per process with HTML autoescaping."""
+    import jinja2
+    env = jinja2.Environment(autoescape=True)
+    env.filters["money"] = lambda value: f"{value:,.2f}"
+    return env.from_string(_EMAIL_TEMPLATE_SRC)
 
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = f"{subject} – {date.today().strftime('%d %b %Y')}"
-    msg["From"]    = f"{company_name} <{sender_email}>"
-    msg["To"]      = f"{recipient_name} <{recipient_email}>"
 
-    # Attach HTML body
-    html_body = build_email_body(df, company_name)
-    msg.attach(MIMEText(html_body, "html"))
+def build_email_body(df: pd.DataFrame, company_name: str, summary: SimpleNamespace) -> str:
+    rows = df[EMAIL_ROW_COLUMNS].itertuples(index=False, name=None)
+    return _email_template().render(rows=rows, company_name=company_name, summary=summary)
 
-    # Attach Excel file
-    with open(report_path, "rb") as f:
-        part = MIMEBase("application", "octet-stream")
-        part.set_payload(f.read())
-    encoders.encode_base64(part)
-    part.add_header(
-        "Content-Disposition",
-        f"attachment; filename={os.path.basename(report_path)}"
-    )
-    msg.attach(part)
 
-    # Send via SMTP
-    log.info(f"Connecting to {smtp_server}:{smtp_port}...")
-    with smtplib.SMTP(smtp_server, smtp_port) as server:
+@contextmanager
+def _smtp_session(cfg: AppConfig):
+    """Yields one authenticated SMTP connection, closed on exit."""
+    log.info(f"Connecting to {cfg.smtp_server}:{cfg.smtp_port}...")
+    with smtplib.SMTP(cfg.smtp_server, cfg.smtp_port) as server:
         server.ehlo()
         server.starttls()
-        server.login(sender_email, sender_password)
-        server.sendmail(sender_email, recipient_email, msg.as_string())
+        server.login(cfg.sender_email, cfg.sender_password)
+        yield server
+
 
-    log.info(f"✅  Email sent successfully to {recipient_email}")
+def send_bulk(server: smtplib.SMTP, sender_email: str, messages):
+    """
+    Sends every (recipient_email, message) pair over an already open
+    session, so the TLS handshake and login are paid once per batch.
+    """
+    for recipient_email, msg in messages:
+        server.send_message(msg, from_addr=sender_email, to_addrs=[recipient_email])
+        log.info(f"✅  Email sent successfully to {recipient_email}")
+
+
+def send_email(cfg: AppConfig, report_path: str, df: pd.DataFrame, summary: SimpleNamespace,
+               html_body: str = None):
+    msg = EmailMessage()
+    msg["Subject"] = f"{cfg.email_subject} – {date.today().strftime('%d %b %Y')}"
+    msg["From"]    = f"{cfg.company_name} <{cfg.sender_email}>"
+    msg["To"]      = f"{cfg.recipient_name} <{cfg.recipient_email}>"
+
+    # HTML body
+    if html_body is None:
+        html_body = build_email_body(df, cfg.company_name, summary)
+    msg.set_content(html_body, subtype="html")
+
+    # Attach Excel file (base64 is applied once, when the message is sent)
+    with open(report_path, "rb") as f:
+        msg.add_attachment(
+            f.read(),
+            maintype="application",
+            subtype="vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            filename=os.path.basename(report_path),
+            cte="base64",
+        )
+
+    # Send via SMTP
+    with _smtp_session(cfg) as server:
+        send_bulk(server, cfg.sender_email, [(cfg.recipient_email, msg)])
 
 
 # ─────────────────────────────────────────────────────────────
 #  5. MAIN ENTRY POINT
 # ─────────────────────────────────────────────────────────────
 
+REPORT_CACHE_DIR      = os.path.join(REPORT_DIR, ".cache")
+REPORT_CACHE_MAX_AGE  = 7 * 24 * 3600   # seconds
+
+
+def _purge_report_cache(cache_dir: str = REPORT_CACHE_DIR, max_age: int = REPORT_CACHE_MAX_AGE):
+    """Deletes cached reports older than max_age seconds."""
+    if not os.path.isdir(cache_dir):
+        return
+    cutoff = time.time() - max_age
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+
+
+def _report_fingerprint(df: pd.DataFrame, company_name: str) -> str:
+    """Stable hash of the report inputs: every row value plus the heading."""
+    h = hashlib.blake2b(pd.util.hash_pandas_object(df, index=False).values.tobytes(), digest_size=16)
+    h.update(company_name.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _build_artifacts(df: pd.DataFrame, company_name: str, summary: SimpleNamespace) -> tuple:
+    # Build both at once: xlsxwriter spends much of its time in zlib and file
+    # writes, which release the GIL for the HTML renderer
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f_xlsx = ex.submit(generate_excel_report, df, company_name, summary)
+        f_html = ex.submit(build_email_body, df, company_name, summary)
+        return f_xlsx.result(), f_html.result()
+
+
+def build_report_artifacts(df: pd.DataFrame, company_name: str, summary: SimpleNamespace,
+                           use_cache: bool = True) -> tuple:
+    """
+    Returns (report_path, html_body), reusing the workbook and email body
+    from reports/.cache when an earlier run today saw identical data.
+    With use_cache=False (save_local_copy = false) nothing is read from or
+    written to the cache, so no copy of the customer data outlives the run.
+    """
+    _purge_report_cache()
+    if not use_cache:
+        return _build_artifacts(df, company_name, summary)
+
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    today = summary.report_date
+    key = _report_fingerprint(df, company_name)
+    cached_xlsx = os.path.join(REPORT_CACHE_DIR, f"{today.isoformat()}_{key}.xlsx")
+    cached_html = os.path.join(REPORT_CACHE_DIR, f"{today.isoformat()}_{key}.html")
+
+    # The .xlsx is moved into place last, so its presence means both files are complete
+    if os.path.exists(cached_xlsx):
+        report_path = report_path_for(today)
+        shutil.copyfile(cached_xlsx, report_path)
+        with open(cached_html, "r", encoding="utf-8") as f:
+            html_body = f.read()
+        log.info(f"Data unchanged since last run — reusing cached report {key}")
+        return report_path, html_body
+
+    report_path, html_body = _build_artifacts(df, company_name, summary)
+    # Write under a temporary name and os.replace() into place, so a crash or a
+    # concurrent run never leaves a half-written file under the cache key
+    tmp_suffix = f".{os.getpid()}.tmp"
+    with open(cached_html + tmp_suffix, "w", encoding="utf-8") as f:
+        f.write(html_body)
+    os.replace(cached_html + tmp_suffix, cached_html)
+    shutil.copyfile(report_path, cached_xlsx + tmp_suffix)
+    os.replace(cached_xlsx + tmp_suffix, cached_xlsx)
+    return report_path, html_body
+
+
 def main():
     log.info("=" * 55)
     log.info("  LOAN MONITORING SYSTEM — Starting Run")
@@ -532,33 +857,33 @@ def main():
 
     # Load config
     cfg = load_config("config.ini")
-    days_ahead      = cfg.getint("REPORT", "days_lookahead", fallback=7)
-    include_overdue = cfg.getboolean("REPORT", "include_overdue", fallback=True)
-    save_local_copy = cfg.getboolean("REPORT", "save_local_copy", fallback=True)
-    company_name    = cfg.get("EMAIL", "company_name", fallback="Loan Management System")
-
-    # Connect to DB and fetch loans
-    conn = get_db_connection(cfg)
-    df = fetch_due_loans(conn, days_ahead=days_ahead, include_overdue=include_overdue)
-    conn.close()
+
+    # Fetch loans over a pooled connection; a one-shot run releases it right away
+    try:
+        with borrow_conn(cfg) as conn:
+            df = fetch_due_loans(conn, days_ahead=cfg.days_lookahead, include_overdue=cfg.include_overdue)
+    finally:
+        close_db_pool()
 
     if df.empty:
         log.info("No loans due within the reporting window. No email sent.")
         return
 
-    # Generate Excel report
-    report_path = generate_excel_report(df, company_name)
+    # Generate Excel report and email body (or reuse today's cached copy)
+    summary = _compute_summary(df, date.today())
+    report_path, html_body = build_report_artifacts(df, cfg.company_name, summary,
+                                                    use_cache=cfg.save_local_copy)
 
     # Send email
     try:
-        send_email(cfg, report_path, df)
+        send_email(cfg, report_path, df, summary, html_body)
     except Exception as e:
         log.error(f"❌  Failed to send email: {e}")
         log.info(f"Report saved locally at: {report_path}")
         raise
 
     # Clean up local copy if not needed
-    if not save_local_copy and os.path.exists(report_path):
+    if not cfg.save_local_copy and os.path.exists(report_path):
         os.remove(report_path)
         log.info("Local report copy removed (save_local_copy=false).")
 
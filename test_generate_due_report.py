@@ -0,0 +1,221 @@
+import csv
+import email
+import email.policy
+import io
+import smtplib
+import socketserver
+import threading
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import generate_due_report as gdr
+
+
+def test_libdeflate_zip_reads_back_with_zipfile():
+    if gdr.deflate is None:
+        pytest.skip("deflate (libdeflate bindings) not installed")
+    members = [
+        ("Loans_Due_Next_7_Days.csv", b"Member Number,Member Name\r\n" + b"1001,Alice\r\n" * 5000),
+        ("ripoti_ya_mikopo_é.csv", b""),
+    ]
+    buf = io.BytesIO()
+    gdr.write_libdeflate_zip(buf, members, level=9)
+
+    with zipfile.ZipFile(io.BytesIO(buf.getvalue())) as zf:
+        assert zf.testzip() is None
+        assert [info.filename for info in zf.infolist()] == [name for name, _ in members]
+        for info, (name, data) in zip(zf.infolist(), members):
+            assert zf.read(name) == data
+            assert info.compress_type == zipfile.ZIP_DEFLATED
+            assert info.create_system == 3
+            assert info.external_attr >> 16 == 0o100644
+
+
+@pytest.mark.parametrize("use_libdeflate", [False, True], ids=["zipfile", "libdeflate"])
+def test_write_report_zip_contains_the_csv(tmp_path, monkeypatch, use_libdeflate):
+    if use_libdeflate and gdr.deflate is None:
+        pytest.skip("deflate (libdeflate bindings) not installed")
+    if not use_libdeflate:
+        monkeypatch.setattr(gdr, "deflate", None)
+    loans = [[("1001", "Alice", "2026-10-20", 1500.0), ("1002", "Brian", "2026-10-21", 250.5)]]
+    zip_path = tmp_path / "report.zip"
+    data = gdr.write_report_zip(str(zip_path), "loans.csv", iter(loans))
+
+    assert zip_path.read_bytes() == data
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        assert zf.read("loans.csv") == (
+            b"Member Number,Member Name,Due Date,Loan Amount\r\n"
+            b'1001,Alice,2026-10-20,"1,500.00"\r\n'
+            b"1002,Brian,2026-10-21,250.50\r\n"
+        )
+
+
+def _csv_writer_reference(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(gdr.CSV_HEADER)
+    for member_number, member_name, due_date, loan_amount in rows:
+        writer.writerow([member_number, member_name, due_date.strftime("%Y-%m-%d"),
+                         f"{float(loan_amount):,.2f}"])
+    return out.getvalue().encode("utf-8")
+
+
+@pytest.mark.parametrize("names", [
+    ["Alice", "Brian", "Carol"],
+    ["Otieno, Jane", "Brian", "Carol"],
+    ['Wanjiru "Shiku"', "Brian", "Carol"],
+    [None, "Brian", "Carol"],
+    ["Line\nbreak", "Brian", "Carol"],
+], ids=["plain", "comma", "quote", "none", "newline"])
+def test_render_csv_matches_csv_writer(names):
+    amounts = [Decimal("999.99"), Decimal("1000.00"), Decimal("1234567.891")]
+    rows = [(1000 + i, name, date(2026, 10, 20 + i), amount)
+            for i, (name, amount) in enumerate(zip(names, amounts))]
+
+    batches = [rows[:2], rows[2:]]
+
+    assert gdr.render_csv(batches) == _csv_writer_reference(rows)
+
+
+class _FakeCursor:
+    arraysize = 1
+
+    def __init__(self, rows):
+        self._rows = list(rows)
+
+    def execute(self, query, *params):
+        self.query, self.params = query, params
+
+    def fetchmany(self):
+        batch = self._rows[:self.arraysize]
+        del self._rows[:self.arraysize]
+        return batch
+
+
+class _FakeConnection:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def cursor(self):
+        return _FakeCursor(self._rows)
+
+
+def test_email_totals_come_from_the_streamed_rows(monkeypatch):
+    rows = [("1001", "Alice", "2026-10-20", 1500.0), ("1002", "Brian", "2026-10-21", 250.5)] * 7
+    monkeypatch.setattr(gdr, "FETCH_BATCH_SIZE", 3)
+
+    batches, totals = gdr.fetch_loans_due_next_7_days(_FakeConnection(rows))
+    csv_bytes = gdr.render_csv(batches)
+
+    assert csv_bytes.count(b"\r\n") == len(rows) + 1
+    assert (totals.count, totals.amount) == (14, 7 * 1750.5)
+
+
+class _FakeSMTPHandler(socketserver.StreamRequestHandler):
+    # Just enough ESMTP for smtplib plus RFC 3030 BDAT; each complete
+    # message is appended to server.messages as (MAIL FROM line, bytes).
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self.reply("220 fake ESMTP")
+        mail_from = None
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb, _, arg = line.decode("ascii").rstrip("\r\n").partition(" ")
+            verb = verb.upper()
+            if verb == "EHLO":
+                self.reply("250-fake greets you")
+                for extension in self.server.extensions:
+                    self.reply(f"250-{extension}")
+                self.reply("250 OK")
+            elif verb == "MAIL":
+                mail_from = arg
+                self.reply("250 OK")
+            elif verb in ("RCPT", "RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "BDAT":
+                size, last = arg.split()
+                assert last == "LAST"
+                self.server.messages.append((mail_from, self.rfile.read(int(size))))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 go ahead")
+                lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line == b".\r\n":
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b".") else data_line)
+                self.server.messages.append((mail_from, b"".join(lines)))
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+@pytest.fixture
+def fake_smtp():
+    def start(extensions):
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FakeSMTPHandler)
+        server.daemon_threads = True
+        server.extensions = extensions
+        server.messages = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        client = smtplib.SMTP(*server.server_address, timeout=10)
+        clients.append(client)
+        return server, client
+
+    servers, clients = [], []
+    yield start
+    for client in clients:
+        client.quit()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+# Every byte value, plus bare CR, bare LF and CRLF the MIME generator would rewrite
+_BINARY_REPORT = bytes(range(256)) + b"a\rb\nc\r\nd\r\n.\r\n" + b"PK\x03\x04" * 100
+
+
+def _received_attachment(message_bytes):
+    msg = email.message_from_bytes(message_bytes, policy=email.policy.default)
+    (attachment,) = msg.iter_attachments()
+    return msg, attachment
+
+
+def test_send_email_bdat_delivers_attachment_bytes_unchanged(fake_smtp):
+    server, client = fake_smtp(["CHUNKING", "BINARYMIME", "8BITMIME"])
+
+    gdr.send_email(client, [("reports/LoanDueReport.zip", _BINARY_REPORT)], "2026-10-14", 2, 1750.5)
+
+    ((mail_from, wire),) = server.messages
+    assert "BODY=BINARYMIME" in mail_from
+    msg, attachment = _received_attachment(wire)
+    assert "Total Loans Due: 2" in msg.get_body(("plain",)).get_content()
+    assert attachment["Content-Transfer-Encoding"] == "binary"
+    assert attachment.get_content_type() == "application/zip"
+    assert attachment.get_filename() == "LoanDueReport.zip"
+    assert attachment.get_payload(decode=True) == _BINARY_REPORT
+
+
+def test_send_email_falls_back_to_base64_without_chunking(fake_smtp):
+    server, client = fake_smtp(["8BITMIME"])
+
+    gdr.send_email(client, [("reports/LoanDueReport.zip", _BINARY_REPORT)], "2026-10-14", 2, 1750.5)
+
+    ((mail_from, wire),) = server.messages
+    assert "BINARYMIME" not in mail_from
+    _, attachment = _received_attachment(wire)
+    assert attachment["Content-Transfer-Encoding"] == "base64"
+    assert attachment.get_content() == _BINARY_REPORT
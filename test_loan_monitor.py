@@ -0,0 +1,61 @@
+import datetime
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("xlsxwriter")
+
+import loan_monitor as lm  # noqa: E402
+
+
+def _loans(days, balances):
+    today = datetime.date(2026, 10, 14)
+    n = len(days)
+    df = pd.DataFrame({
+        "Customer Name": [f"Customer {i}" for i in range(n)],
+        "Loan ID": [f"LN-{i:04d}" for i in range(n)],
+        "Amount Borrowed": [1000.0 * (i + 1) for i in range(n)],
+        "Outstanding Balance": balances,
+        "Due Date": [today + datetime.timedelta(days=d) for d in days],
+        "Days Remaining": np.array(days, dtype="int32"),
+        "Phone Number": ["+254 700 000 000"] * n,
+        "Email": ["customer@example.com"] * n,
+        "Loan Officer / Branch": ["James Mwangi / Nairobi CBD Branch"] * n,
+        "Loan Status": ["Overdue" if d < 0 else "Active" for d in days],
+    })
+    df = df.astype({"Loan Status": "category", "Loan Officer / Branch": "category"})
+    return df, today
+
+
+def test_excel_report_writes_null_balance_as_blank(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df, today = _loans([-1, 2, 5], [500.0, np.nan, 250.0])
+
+    path = lm.generate_excel_report(df, "ACME", lm._compute_summary(df, today))
+
+    openpyxl = pytest.importorskip("openpyxl")
+    ws = openpyxl.load_workbook(path)["Loans Due This Week"]
+    balance_col = df.columns.get_loc("Outstanding Balance") + 1
+    assert [ws.cell(row=r, column=balance_col).value for r in (5, 6, 7)] == [500.0, None, 250.0]
+
+
+def test_compute_summary_matches_the_mask_expressions():
+    df, today = _loans([-3, -1, 0, 1, 3, 4, 7, 8],
+                       [900.0, np.nan, 800.0, 700.0, 600.0, 500.0, 400.0, 300.0])
+    days = df["Days Remaining"]
+    overdue_df = df[df["Loan Status"] == "Overdue"]
+
+    summary = lm._compute_summary(df, today)
+
+    assert summary.report_date == today
+    assert summary.total_count == len(df)
+    assert summary.active_count == len(df[df["Loan Status"] == "Active"])
+    assert summary.overdue_count == len(overdue_df)
+    assert summary.due_today == len(df[days == 0])
+    assert summary.due_1_3 == len(df[(days >= 1) & (days <= 3)])
+    assert summary.due_4_7 == len(df[(days >= 4) & (days <= 7)])
+    assert summary.already_overdue == len(df[days < 0])
+    assert summary.total_borrowed == df["Amount Borrowed"].sum()
+    assert summary.total_outstanding == df["Outstanding Balance"].sum()
+    assert summary.overdue_outstanding == overdue_df["Outstanding Balance"].sum()